@@ -8,12 +8,181 @@ Versión: 1.0
 
 import pandas as pd
 import networkx as nx
-from collections import defaultdict, deque
 import numpy as np
 from typing import List, Dict, Tuple, Set
+from operator import itemgetter
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 import os
 
+# pyarrow es opcional: si está instalado, los CSV de resultados se escriben
+# con su serializador C multihilo en lugar del escritor de pandas
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Numba es opcional: si está instalado, el kernel de DFS se compila con JIT;
+# si no, la misma función corre interpretada sobre los arreglos CSR
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Decorador nulo cuando numba no está disponible"""
+        if args and callable(args[0]):
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
+
+# SciPy es opcional: si está instalado, los componentes conexos se
+# calculan en C sobre la adyacencia CSR en lugar del BFS de NetworkX
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+
+@njit(cache=True)
+def _dfs_agrupar_csr(indptr, nbr, elen, start, tol_sup, tol_inf):
+    """
+    DFS iterativo sobre la adyacencia CSR que asigna cada segmento
+    visitado a un grupo de ~1km.
+
+    Args:
+        indptr: np.int64[n+1] - offsets por nodo en nbr/elen
+        nbr: np.int64[2m] - nodo destino de cada media-arista
+        elen: np.float64[2m] - longitud_m de cada media-arista
+        start: índice denso del nodo de inicio
+        tol_sup: longitud máxima aceptada para un grupo
+        tol_inf: longitud a partir de la cual se cierra un grupo
+
+    Returns:
+        (order_node, order_prev, order_epos, order_grupo) - arreglos con
+        los segmentos en orden de visita y el grupo asignado a cada uno
+    """
+    n = indptr.shape[0] - 1
+    m2 = nbr.shape[0]
+
+    visitados = np.zeros(n, dtype=np.bool_)
+    stack_node = np.empty(m2 + 1, dtype=np.int64)
+    stack_prev = np.empty(m2 + 1, dtype=np.int64)
+    stack_epos = np.empty(m2 + 1, dtype=np.int64)
+    stack_node[0] = start
+    stack_prev[0] = -1
+    stack_epos[0] = -1
+    top = 1
+
+    order_node = np.empty(m2, dtype=np.int64)
+    order_prev = np.empty(m2, dtype=np.int64)
+    order_epos = np.empty(m2, dtype=np.int64)
+    order_grupo = np.empty(m2, dtype=np.int64)
+    k = 0
+
+    longitud_actual = 0.0
+    grupo_id = 1
+
+    while top > 0:
+        top -= 1
+        nodo_actual = stack_node[top]
+        nodo_anterior = stack_prev[top]
+        epos = stack_epos[top]
+
+        if visitados[nodo_actual]:
+            continue
+
+        # Si hay un segmento que agregar (no es el inicio)
+        if epos >= 0:
+            longitud_segmento = elen[epos]
+            if longitud_actual + longitud_segmento <= tol_sup:
+                # Agregar al grupo actual
+                order_node[k] = nodo_actual
+                order_prev[k] = nodo_anterior
+                order_epos[k] = epos
+                order_grupo[k] = grupo_id
+                k += 1
+                longitud_actual += longitud_segmento
+
+                # Si alcanzamos el objetivo, cerrar grupo
+                if longitud_actual >= tol_inf:
+                    grupo_id += 1
+                    longitud_actual = 0.0
+            else:
+                # Este segmento excede la tolerancia, crear nuevo grupo con él
+                if longitud_actual > 0.0:
+                    grupo_id += 1
+                order_node[k] = nodo_actual
+                order_prev[k] = nodo_anterior
+                order_epos[k] = epos
+                order_grupo[k] = grupo_id
+                k += 1
+                longitud_actual = longitud_segmento
+
+        visitados[nodo_actual] = True
+
+        # Explorar vecinos en orden inverso para mantener orden natural
+        for p in range(indptr[nodo_actual + 1] - 1, indptr[nodo_actual] - 1, -1):
+            vecino = nbr[p]
+            if not visitados[vecino]:
+                stack_node[top] = vecino
+                stack_prev[top] = nodo_actual
+                stack_epos[top] = p
+                top += 1
+
+    return order_node[:k], order_prev[:k], order_epos[:k], order_grupo[:k]
+
+
+@njit(cache=True)
+def _scan_grupos_camino(longitudes, tol_sup, tol_inf):
+    """
+    Escaneo de suma acumulada sobre un arreglo de longitudes que asigna
+    una etiqueta de grupo a cada segmento de un camino.
+
+    Args:
+        longitudes: np.float64[k] - longitud_m de cada segmento en orden
+        tol_sup: longitud máxima aceptada para un grupo
+        tol_inf: longitud a partir de la cual se cierra un grupo
+
+    Returns:
+        (etiquetas, es_largo) - etiqueta de grupo por segmento y marca de
+        los segmentos individuales que exceden por sí solos la tolerancia
+    """
+    k = longitudes.shape[0]
+    etiquetas = np.empty(k, dtype=np.int64)
+    es_largo = np.zeros(k, dtype=np.bool_)
+    grupo = 0
+    acumulado = 0.0
+    for i in range(k):
+        longitud = longitudes[i]
+        if acumulado + longitud > tol_sup:
+            if acumulado > 0.0:
+                grupo += 1
+                acumulado = 0.0
+            if longitud > tol_sup:
+                # Segmento largo individual: grupo propio
+                etiquetas[i] = grupo
+                es_largo[i] = True
+                grupo += 1
+            else:
+                etiquetas[i] = grupo
+                acumulado = longitud
+        else:
+            etiquetas[i] = grupo
+            acumulado += longitud
+            if acumulado >= tol_inf:
+                grupo += 1
+                acumulado = 0.0
+    return etiquetas, es_largo
+
 # ============================================================================
 # CONFIGURACIÓN DE PARÁMETROS
 # ============================================================================
@@ -34,8 +203,43 @@ def parse_arguments():
         default='./data',
         help='Directorio de salida para archivos generados (default: ./data)'
     )
+    parser.add_argument(
+        '--formats',
+        type=str,
+        default='geojson,gpkg',
+        help='Formatos GIS a exportar, separados por coma: geojson,gpkg '
+             '(default: ambos)'
+    )
+    parser.add_argument(
+        '--no-gis',
+        action='store_true',
+        help='Omitir la exportación GIS (GeoJSON/GeoPackage); evita '
+             'importar geopandas/shapely en corridas solo-CSV'
+    )
+    parser.add_argument(
+        '--compute-diameter',
+        action='store_true',
+        help='Calcular el diámetro exacto del grafo (APSP, costoso en '
+             'redes grandes); por defecto se reporta la aproximación '
+             'por doble barrido BFS'
+    )
     return parser.parse_args()
 
+def leer_csv(path: str) -> pd.DataFrame:
+    """Leer un CSV con el parser multihilo de pyarrow si está disponible"""
+    if PYARROW_AVAILABLE:
+        return pd.read_csv(path, engine='pyarrow')
+    return pd.read_csv(path)
+
+
+def escribir_csv(df: pd.DataFrame, path: str):
+    """Escribir un DataFrame a CSV, con pyarrow si está disponible"""
+    if PYARROW_AVAILABLE:
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+    else:
+        df.to_csv(path, index=False)
+
+
 def cargar_datos_csv(input_dir):
     """
     Cargar datos desde archivos CSV o generar datos de ejemplo
@@ -51,7 +255,7 @@ def cargar_datos_csv(input_dir):
     # Leer segmentos (aristas)
     try:
         segmentos_path = os.path.join(input_dir, 'segmentos_circuito.csv')
-        df_segmentos = pd.read_csv(segmentos_path)
+        df_segmentos = leer_csv(segmentos_path)
         print(f"✅ Segmentos cargados: {len(df_segmentos)} registros")
     except FileNotFoundError:
         print("⚠️  Creando datos de ejemplo...")
@@ -69,7 +273,7 @@ def cargar_datos_csv(input_dir):
     # Leer nodos (vértices)
     try:
         nodos_path = os.path.join(input_dir, 'nodos_circuito.csv')
-        df_nodos = pd.read_csv(nodos_path)
+        df_nodos = leer_csv(nodos_path)
         print(f"✅ Nodos cargados: {len(df_nodos)} registros")
     except FileNotFoundError:
         print("⚠️  Creando datos de nodos de ejemplo...")
@@ -102,50 +306,170 @@ def cargar_datos_csv(input_dir):
 class RedElectrica:
     """Clase para gestionar la red eléctrica usando NetworkX"""
     
-    def __init__(self):
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
         self.G = nx.Graph()
-        self.segmentos_por_grupo = defaultdict(list)
+        # Mapa escalar id_segmento -> grupo_id (no una lista por segmento)
+        self.segmentos_por_grupo = {}
         self.grupos = {}
-        
+        # Escalares por grupo en columnas paralelas (SoA): evita recorrer
+        # el dict de dicts para estadísticas y exportación
+        self._grupo_ids = []
+        self._grupo_nsegs = []
+        self._grupo_lens = []
+        # Adyacencia CSR construida en cargar_datos (ver _build_csr)
+        self._csr_indptr = None
+        self._csr_nbr = None
+        self._csr_eid = None
+        self._csr_elen = None
+        self._id_to_dense = {}
+        self._dense_to_id = None
+        # Índice tipo -> [ids de nodo] construido en cargar_datos
+        self._nodos_por_tipo = {}
+        # Subestación principal cacheada tras la primera búsqueda
+        self._subestacion_principal = None
+        # Índice id_segmento -> (u, v, atributos) construido bajo demanda
+        self._edge_by_segid = None
+
     def cargar_datos(self, df_segmentos: pd.DataFrame, df_nodos: pd.DataFrame):
         """Cargar datos de segmentos y nodos al grafo"""
-        
-        # Agregar nodos con atributos
-        for _, nodo in df_nodos.iterrows():
-            self.G.add_node(
-                nodo['id_nodo'],
-                nombre=nodo['nombre'],
-                tipo=nodo['tipo'],
-                voltaje_kv=nodo['voltaje_kv'],
-                pos=(nodo['x'], nodo['y'])
-            )
-        
-        # Agregar aristas (segmentos) con atributos
-        for _, segmento in df_segmentos.iterrows():
-            self.G.add_edge(
-                segmento['nodo_inicio'],
-                segmento['nodo_fin'],
-                id_segmento=segmento['id_segmento'],
-                longitud_m=segmento['longitud_m'],
-                tipo_conductor=segmento['tipo_conductor'],
-                capacidad_amp=segmento['capacidad_amp'],
-                id_circuito=segmento['id_circuito']
-            )
-        
+
+        # Agregar nodos con atributos en bloque (itertuples es mucho más
+        # rápido que iterrows porque no construye una Series por fila).
+        # Los nodos van primero para conservar el orden de inserción de
+        # df_nodos, del que depende el desempate por grado cuando no hay
+        # subestación
+        self.G = nx.Graph()
+        self.G.add_nodes_from(
+            (nodo.id_nodo, {
+                'nombre': nodo.nombre,
+                'tipo': nodo.tipo,
+                'voltaje_kv': nodo.voltaje_kv,
+                'pos': (nodo.x, nodo.y)
+            })
+            for nodo in df_nodos.itertuples(index=False)
+        )
+
+        # Agregar aristas (segmentos) en bloque: evita el costo por fila de
+        # iterrows() y las llamadas individuales a add_edge
+        self.G.add_edges_from(
+            (seg.nodo_inicio, seg.nodo_fin, {
+                'id_segmento': seg.id_segmento,
+                'longitud_m': seg.longitud_m,
+                'tipo_conductor': seg.tipo_conductor,
+                'capacidad_amp': seg.capacidad_amp,
+                'id_circuito': seg.id_circuito
+            })
+            for seg in df_segmentos.itertuples(index=False)
+        )
+
+        # Conservar el DataFrame de segmentos para exportaciones vectorizadas
+        self._df_segmentos = df_segmentos
+
+        # Construir la adyacencia CSR para el DFS compilado
+        self._build_csr(df_segmentos, df_nodos)
+
+        # Índice tipo -> [ids de nodo] para localizar subestaciones en O(1)
+        self._nodos_por_tipo = (
+            df_nodos.groupby('tipo')['id_nodo'].apply(list).to_dict()
+        )
+
+        # El grafo cambió: descartar el índice por segmento y la
+        # subestación principal cacheados
+        self._edge_by_segid = None
+        self._subestacion_principal = None
+
         print(f"   Nodos agregados: {self.G.number_of_nodes()}")
         print(f"   Segmentos agregados: {self.G.number_of_edges()}")
-    
+
+    @property
+    def edge_by_segid(self) -> Dict:
+        """
+        Índice id_segmento -> (u, v, atributos) para búsquedas O(1) sin
+        recorrer todas las aristas. Se construye en el primer acceso y se
+        descarta cuando cargar_datos reconstruye el grafo.
+        """
+        if self._edge_by_segid is None:
+            self._edge_by_segid = {
+                data['id_segmento']: (u, v, data)
+                for u, v, data in self.G.edges(data=True)
+            }
+        return self._edge_by_segid
+
+    def _build_csr(self, df_segmentos: pd.DataFrame, df_nodos: pd.DataFrame):
+        """
+        Construir la adyacencia en formato CSR (indptr/nbr/eid/elen) con
+        ids de nodo densos 0..n-1, para que el DFS recorra arreglos NumPy
+        contiguos en lugar de los diccionarios de NetworkX.
+
+        El orden de vecinos por nodo replica el orden de inserción de
+        NetworkX (orden de filas del DataFrame), intercalando las dos
+        medias-aristas de cada segmento.
+        """
+        src = df_segmentos['nodo_inicio'].to_numpy()
+        dst = df_segmentos['nodo_fin'].to_numpy()
+        m = len(df_segmentos)
+
+        # Medias-aristas intercaladas: fila i genera las posiciones 2i y 2i+1
+        half_src = np.empty(2 * m, dtype=src.dtype)
+        half_dst = np.empty(2 * m, dtype=src.dtype)
+        half_src[0::2] = src
+        half_src[1::2] = dst
+        half_dst[0::2] = dst
+        half_dst[1::2] = src
+
+        # Remapear ids (posiblemente dispersos o strings) a densos 0..n-1;
+        # incluir los nodos sin segmentos para que el mapeo sea completo
+        todos = np.concatenate([half_src, half_dst,
+                                df_nodos['id_nodo'].to_numpy()])
+        codes, uniques = pd.factorize(todos)
+        n = len(uniques)
+        src_codes = codes[:2 * m]
+        dst_codes = codes[2 * m:4 * m]
+
+        # Ordenamiento estable por nodo origen = counting sort del CSR
+        orden = np.argsort(src_codes, kind='stable')
+
+        self._csr_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src_codes, minlength=n),
+                  out=self._csr_indptr[1:])
+        self._csr_nbr = dst_codes[orden].astype(np.int64)
+        self._csr_eid = np.repeat(
+            df_segmentos['id_segmento'].to_numpy(), 2)[orden]
+        self._csr_elen = np.repeat(
+            df_segmentos['longitud_m'].to_numpy(np.float64), 2)[orden]
+        self._dense_to_id = uniques
+        self._id_to_dense = {nid: i for i, nid in enumerate(uniques)}
+
+    def reset_grouping(self):
+        """
+        Limpiar solo el estado de agrupación, sin tocar el grafo ni la
+        adyacencia CSR, para poder re-ejecutar dfs_agrupar_segmentos con
+        otros parámetros sin recargar los datos
+        """
+        self.grupos = {}
+        self.segmentos_por_grupo = {}
+        self._grupo_ids = []
+        self._grupo_nsegs = []
+        self._grupo_lens = []
+
     def encontrar_subestacion_principal(self) -> int:
         """Encontrar la subestación principal (nodo con tipo 'Subestacion')"""
-        for nodo in self.G.nodes(data=True):
-            if nodo[1]['tipo'] == 'Subestacion':
-                print(f"   Subestación principal encontrada: Nodo {nodo[0]} - {nodo[1]['nombre']}")
-                return nodo[0]
-        
+        if self._subestacion_principal is not None:
+            return self._subestacion_principal
+
+        subestaciones = self._nodos_por_tipo.get('Subestacion')
+        if subestaciones:
+            nodo = subestaciones[0]
+            print(f"   Subestación principal encontrada: Nodo {nodo} - {self.G.nodes[nodo]['nombre']}")
+            self._subestacion_principal = nodo
+            return nodo
+
         # Si no hay subestación, usar el nodo con mayor grado
-        grados = dict(self.G.degree())
-        nodo_principal = max(grados, key=grados.get)
+        # (argmax en streaming, sin materializar el dict de grados)
+        nodo_principal = max(self.G.degree(), key=itemgetter(1))[0]
         print(f"   Usando nodo con mayor grado: Nodo {nodo_principal}")
+        self._subestacion_principal = nodo_principal
         return nodo_principal
     
     def dfs_agrupar_segmentos(self, longitud_objetivo_m: float = 1000.0, 
@@ -159,157 +483,106 @@ class RedElectrica:
         """
         
         nodo_inicio = self.encontrar_subestacion_principal()
-        visitados = set()
-        grupos = []
-        grupo_actual = []
-        longitud_actual = 0.0
-        grupo_id = 1
-        
-        # Usar pila para DFS iterativo: (nodo_actual, nodo_anterior, segmento_id, longitud)
-        pila = [(nodo_inicio, None, None, 0.0)]
-        
+
         print(f"\n🎯 AGRUPANDO SEGMENTOS EN GRUPOS DE ~{longitud_objetivo_m/1000}km")
         print(f"   Tolerancia: ±{tolerancia_km*1000}m")
         print("-" * 60)
-        
-        while pila:
-            nodo_actual, nodo_anterior, segmento_id, longitud_segmento = pila.pop()
-            
-            if nodo_actual in visitados:
-                continue
-            
-            # Si hay un segmento que agregar (no es el inicio)
-            if segmento_id is not None:
-                # Verificar si agregar este segmento al grupo actual
-                if (longitud_actual + longitud_segmento <= 
-                    longitud_objetivo_m * (1 + tolerancia_km)):
-                    
-                    # Agregar al grupo actual
-                    grupo_actual.append({
-                        'segmento_id': segmento_id,
-                        'longitud_m': longitud_segmento,
-                        'nodo_inicio': nodo_anterior,
-                        'nodo_fin': nodo_actual
-                    })
-                    longitud_actual += longitud_segmento
-                    
-                    print(f"   Grupo {grupo_id}: +Segmento {segmento_id} "
-                          f"({longitud_segmento}m) "
-                          f"[Acumulado: {longitud_actual:.1f}m]")
-                    
-                    # Si alcanzamos el objetivo, cerrar grupo
-                    if longitud_actual >= longitud_objetivo_m * (1 - tolerancia_km):
-                        self._cerrar_grupo(grupo_actual, longitud_actual, grupo_id)
-                        grupo_actual = []
-                        longitud_actual = 0.0
-                        grupo_id += 1
-                
-                else:
-                    # Este segmento excede la tolerancia, crear nuevo grupo con él
-                    if grupo_actual:  # Si hay grupo actual, cerrarlo primero
-                        self._cerrar_grupo(grupo_actual, longitud_actual, grupo_id)
-                        grupo_id += 1
-                    
-                    # Crear nuevo grupo con este segmento
-                    grupo_actual = [{
-                        'segmento_id': segmento_id,
-                        'longitud_m': longitud_segmento,
-                        'nodo_inicio': nodo_anterior,
-                        'nodo_fin': nodo_actual
-                    }]
-                    longitud_actual = longitud_segmento
-                    print(f"   🔄 Nuevo grupo {grupo_id} con segmento {segmento_id}")
-            
-            visitados.add(nodo_actual)
-            
-            # Explorar vecinos en orden inverso para mantener orden natural
-            vecinos = list(self.G.neighbors(nodo_actual))
-            vecinos.reverse()  # Para procesar en el orden correcto con pila LIFO
-            
-            for vecino in vecinos:
-                if vecino not in visitados:
-                    # Obtener información del segmento
-                    segmento_data = self.G.get_edge_data(nodo_actual, vecino)
-                    pila.append((
-                        vecino,
-                        nodo_actual,
-                        segmento_data['id_segmento'],
-                        segmento_data['longitud_m']
-                    ))
-        
+
+        # Recorrido + agrupación en el kernel CSR (compilado si hay numba)
+        order_node, order_prev, order_epos, order_grupo = _dfs_agrupar_csr(
+            self._csr_indptr,
+            self._csr_nbr,
+            self._csr_elen,
+            self._id_to_dense[nodo_inicio],
+            longitud_objetivo_m * (1 + tolerancia_km),
+            longitud_objetivo_m * (1 - tolerancia_km)
+        )
+
+        # Reconstruir los grupos a partir de los arreglos del kernel
+        grupo_actual = []
+        longitud_actual = 0.0
+        grupo_id = int(order_grupo[0]) if len(order_grupo) else 1
+
+        for i in range(len(order_grupo)):
+            if order_grupo[i] != grupo_id:
+                self._cerrar_grupo(grupo_actual, longitud_actual, grupo_id)
+                grupo_actual = []
+                longitud_actual = 0.0
+                grupo_id = int(order_grupo[i])
+
+            epos = order_epos[i]
+            longitud_segmento = float(self._csr_elen[epos])
+            grupo_actual.append({
+                'segmento_id': self._csr_eid[epos],
+                'longitud_m': longitud_segmento,
+                'nodo_inicio': self._dense_to_id[order_prev[i]],
+                'nodo_fin': self._dense_to_id[order_node[i]]
+            })
+            longitud_actual += longitud_segmento
+
+            if self.verbose:
+                print(f"   Grupo {grupo_id}: +Segmento {self._csr_eid[epos]} "
+                      f"({longitud_segmento}m) "
+                      f"[Acumulado: {longitud_actual:.1f}m]")
+
         # Cerrar el último grupo si queda algo
         if grupo_actual:
             self._cerrar_grupo(grupo_actual, longitud_actual, grupo_id)
-        
+
         return self.grupos
     
     def _cerrar_grupo(self, segmentos: List, longitud_total: float, grupo_id: int):
         """Cerrar un grupo y almacenar la información"""
         self.grupos[grupo_id] = {
-            'segmentos': segmentos.copy(),
+            'segmentos': segmentos,
             'longitud_total_m': longitud_total,
             'num_segmentos': len(segmentos),
             'longitud_km': longitud_total / 1000
         }
         
-        # Almacenar relación inversa (segmento -> grupo)
-        for segmento in segmentos:
-            self.segmentos_por_grupo[segmento['segmento_id']] = grupo_id
+        # Acumular escalares del grupo en columnas paralelas
+        self._grupo_ids.append(grupo_id)
+        self._grupo_nsegs.append(len(segmentos))
+        self._grupo_lens.append(longitud_total)
+
+        # Almacenar relación inversa (segmento -> grupo) en una sola
+        # llamada a update en lugar de una escritura por segmento
+        self.segmentos_por_grupo.update(
+            zip((s['segmento_id'] for s in segmentos), repeat(grupo_id))
+        )
         
-        print(f"   ✅ Grupo {grupo_id} CERRADO: "
-              f"{len(segmentos)} segmentos, "
-              f"{longitud_total:.1f}m ({longitud_total/1000:.2f}km)")
+        if self.verbose:
+            print(f"   ✅ Grupo {grupo_id} CERRADO: "
+                  f"{len(segmentos)} segmentos, "
+                  f"{longitud_total:.1f}m ({longitud_total/1000:.2f}km)")
     
 
     def _agrupar_camino(self, segmentos: List, longitud_objetivo: float) -> List:
         """Agrupar segmentos de un camino en tramos de longitud objetivo"""
+        if not segmentos:
+            return []
+
+        # Escaneo sobre un ndarray tipado en lugar de acumular en Python
+        longitudes = np.fromiter(
+            (s['longitud_m'] for s in segmentos),
+            dtype=np.float64, count=len(segmentos)
+        )
+        etiquetas, es_largo = _scan_grupos_camino(
+            longitudes, longitud_objetivo * 1.2, longitud_objetivo * 0.8
+        )
+
+        # Reconstruir los grupos a partir de los cortes de etiqueta
+        cortes = np.flatnonzero(np.diff(etiquetas)) + 1
         grupos = []
-        grupo_actual = []
-        longitud_actual = 0.0
-        
-        for segmento in segmentos:
-            # Si agregar este segmento excede el objetivo (con tolerancia)
-            if longitud_actual + segmento['longitud_m'] > longitud_objetivo * 1.2:
-                # Si el grupo actual tiene algo, cerrarlo
-                if grupo_actual:
-                    grupos.append({
-                        'segmentos': grupo_actual.copy(),
-                        'longitud_total': longitud_actual
-                    })
-                    grupo_actual = []
-                    longitud_actual = 0.0
-                
-                # Si el segmento individual es muy largo (>1.2km)
-                if segmento['longitud_m'] > longitud_objetivo * 1.2:
-                    # Dividir segmento virtualmente (solo para agrupación)
-                    grupos.append({
-                        'segmentos': [segmento],
-                        'longitud_total': segmento['longitud_m'],
-                        'nota': 'Segmento largo individual'
-                    })
-                else:
-                    grupo_actual = [segmento]
-                    longitud_actual = segmento['longitud_m']
-            else:
-                grupo_actual.append(segmento)
-                longitud_actual += segmento['longitud_m']
-                
-                # Si alcanzamos el objetivo, cerrar grupo
-                if longitud_actual >= longitud_objetivo * 0.8:  # 80% del objetivo
-                    grupos.append({
-                        'segmentos': grupo_actual.copy(),
-                        'longitud_total': longitud_actual
-                    })
-                    grupo_actual = []
-                    longitud_actual = 0.0
-        
-        # Agregar último grupo si queda algo
-        if grupo_actual:
-            grupos.append({
-                'segmentos': grupo_actual.copy(),
-                'longitud_total': longitud_actual
-            })
-        
+        for idx in np.split(np.arange(len(segmentos)), cortes):
+            inicio = idx[0]
+            grupo = {
+                'segmentos': [segmentos[i] for i in idx],
+                'longitud_total': float(longitudes[idx].sum())
+            }
+            if es_largo[inicio]:
+                grupo['nota'] = 'Segmento largo individual'
+            grupos.append(grupo)
         return grupos
     
     def analizar_resultados(self, output_dir):
@@ -322,64 +595,60 @@ class RedElectrica:
         print("📊 ANÁLISIS DE RESULTADOS")
         print("=" * 70)
         
-        longitudes = [g['longitud_total_m'] for g in self.grupos.values()]
-        
+        # Las longitudes ya están acumuladas en columna; una sola conversión
+        longitudes = np.asarray(self._grupo_lens, dtype=np.float64)
+
         print(f"\n📈 ESTADÍSTICAS DE GRUPOS:")
         print(f"   • Total grupos formados: {len(self.grupos)}")
-        print(f"   • Longitud promedio: {np.mean(longitudes)/1000:.2f} km")
-        print(f"   • Longitud mínima: {np.min(longitudes)/1000:.2f} km")
-        print(f"   • Longitud máxima: {np.max(longitudes)/1000:.2f} km")
-        print(f"   • Desviación estándar: {np.std(longitudes)/1000:.2f} km")
+        print(f"   • Longitud promedio: {longitudes.mean()/1000:.2f} km")
+        print(f"   • Longitud mínima: {longitudes.min()/1000:.2f} km")
+        print(f"   • Longitud máxima: {longitudes.max()/1000:.2f} km")
+        print(f"   • Desviación estándar: {longitudes.std()/1000:.2f} km")
         
         print("\n📋 DETALLE DE GRUPOS:")
         print("-" * 70)
-        print(f"{'Grupo':<6} {'Segs':<6} {'Longitud (m)':<12} {'Longitud (km)':<12}")
-        print("-" * 70)
-        
-        for grupo_id, info in sorted(self.grupos.items()):
-            print(f"{grupo_id:<6} {info['num_segmentos']:<6} "
-                  f"{info['longitud_total_m']:<12.1f} "
-                  f"{info['longitud_total_m']/1000:<12.2f}")
-        
+
+        # Una sola escritura: pandas formatea la tabla completa en C en
+        # lugar de un print formateado por grupo
+        df_detalle = pd.DataFrame({
+            'Grupo': self._grupo_ids,
+            'Segs': self._grupo_nsegs,
+            'Longitud (m)': np.round(longitudes, 1),
+            'Longitud (km)': np.round(longitudes / 1000, 2)
+        }).sort_values('Grupo')
+        print(df_detalle.to_string(index=False))
+
         # Exportar resultados a CSV
         self.exportar_resultados_csv(output_dir)
     
     def exportar_resultados_csv(self, output_dir):
         """Exportar resultados a archivos CSV"""
-        # 1. Grupos a CSV
-        datos_grupos = []
-        for grupo_id, info in self.grupos.items():
-            datos_grupos.append({
-                'grupo_id': grupo_id,
-                'num_segmentos': info['num_segmentos'],
-                'longitud_total_m': info['longitud_total_m'],
-                'longitud_km': info['longitud_total_m'] / 1000
-            })
-        
-        df_grupos = pd.DataFrame(datos_grupos)
+        # 1. Grupos a CSV, directamente desde las columnas acumuladas
+        longitudes = np.asarray(self._grupo_lens, dtype=np.float64)
+        df_grupos = pd.DataFrame({
+            'grupo_id': self._grupo_ids,
+            'num_segmentos': self._grupo_nsegs,
+            'longitud_total_m': longitudes,
+            'longitud_km': longitudes / 1000
+        })
         grupos_path = os.path.join(output_dir, 'grupos_1km.csv')
-        df_grupos.to_csv(grupos_path, index=False)
-        
-        # 2. Segmentos con su grupo asignado
-        datos_segmentos = []
-        for segmento_id, grupo_id in self.segmentos_por_grupo.items():
-            # Buscar información del segmento
-            for u, v, data in self.G.edges(data=True):
-                if data['id_segmento'] == segmento_id:
-                    datos_segmentos.append({
-                        'segmento_id': segmento_id,
-                        'grupo_id': grupo_id,
-                        'nodo_inicio': u,
-                        'nodo_fin': v,
-                        'longitud_m': data['longitud_m'],
-                        'tipo_conductor': data['tipo_conductor'],
-                        'circuito': data['id_circuito']
-                    })
-                    break
+        escribir_csv(df_grupos, grupos_path)
         
-        df_segmentos_grupo = pd.DataFrame(datos_segmentos)
+        # 2. Segmentos con su grupo asignado: un merge en lugar de buscar
+        # cada segmento recorriendo todas las aristas del grafo (O(m²))
+        df_sg = pd.DataFrame({
+            'segmento_id': list(self.segmentos_por_grupo.keys()),
+            'grupo_id': list(self.segmentos_por_grupo.values())
+        })
+        df_segmentos_grupo = self._df_segmentos.merge(
+            df_sg, left_on='id_segmento', right_on='segmento_id'
+        )
+        df_segmentos_grupo = df_segmentos_grupo[[
+            'segmento_id', 'grupo_id', 'nodo_inicio', 'nodo_fin',
+            'longitud_m', 'tipo_conductor', 'id_circuito'
+        ]].rename(columns={'id_circuito': 'circuito'})
         segmentos_path = os.path.join(output_dir, 'segmentos_con_grupo.csv')
-        df_segmentos_grupo.to_csv(segmentos_path, index=False)
+        escribir_csv(df_segmentos_grupo, segmentos_path)
         
         print(f"\n💾 RESULTADOS EXPORTADOS:")
         print(f"   • {grupos_path}: {len(df_grupos)} grupos")
@@ -388,14 +657,21 @@ class RedElectrica:
 # ============================================================================
 # 3. EJECUCIÓN PRINCIPAL
 # ============================================================================
-def main(input_dir='./data', output_dir='./data'):
+def main(input_dir='./data', output_dir='./data', formats='geojson,gpkg',
+         compute_diameter=False, no_gis=False):
     """
     Función principal de ejecución
-    
+
     Args:
         input_dir: Directorio de entrada para archivos CSV (default: './data')
         output_dir: Directorio de salida para archivos generados (default: './data')
-        
+        formats: Formatos GIS a exportar, separados por coma
+                 (default: 'geojson,gpkg')
+        compute_diameter: Si True, calcula el diámetro exacto (APSP);
+                 por defecto se usa la aproximación por doble barrido BFS
+        no_gis: Si True, omite por completo la exportación GIS (no se
+                 importan geopandas/shapely)
+
     Returns:
         Dict con resultados del proceso:
         {
@@ -425,11 +701,41 @@ def main(input_dir='./data', output_dir='./data'):
         print("🔍 ANÁLISIS TOPOLÓGICO INICIAL")
         print("=" * 70)
         
-        # Análisis básico del grafo
+        # Análisis básico del grafo: un solo cálculo de componentes
+        # conexos responde conexidad y número de componentes a la vez.
+        # Con SciPy corre en C sobre la adyacencia CSR ya construida
+        if SCIPY_AVAILABLE:
+            n_densos = len(red._csr_indptr) - 1
+            matriz = csr_matrix(
+                (np.ones(len(red._csr_nbr), dtype=np.int8),
+                 red._csr_nbr, red._csr_indptr),
+                shape=(n_densos, n_densos)
+            )
+            num_componentes, _ = connected_components(matriz, directed=False)
+        else:
+            num_componentes = nx.number_connected_components(red.G)
+        es_conexo = num_componentes == 1
+
+        etiqueta_diametro = 'Diámetro (aprox.)'
+        if not es_conexo:
+            diametro = 'N/A'
+        elif compute_diameter:
+            # Diámetro exacto bajo demanda: APSP O(n·(n+m))
+            diametro = nx.diameter(red.G)
+            etiqueta_diametro = 'Diámetro'
+        else:
+            # Aproximar el diámetro con doble barrido BFS (cota inferior)
+            # en lugar del APSP exacto de nx.diameter, que es O(n·(n+m))
+            dist = nx.single_source_shortest_path_length(
+                red.G, next(iter(red.G)))
+            extremo = max(dist, key=dist.get)
+            diametro = max(nx.single_source_shortest_path_length(
+                red.G, extremo).values())
+
         print(f"\n📐 PROPIEDADES DEL GRAFO:")
-        print(f"   • Es conexo: {nx.is_connected(red.G)}")
-        print(f"   • Número de componentes conexos: {nx.number_connected_components(red.G)}")
-        print(f"   • Diámetro: {nx.diameter(red.G) if nx.is_connected(red.G) else 'N/A'}")
+        print(f"   • Es conexo: {es_conexo}")
+        print(f"   • Número de componentes conexos: {num_componentes}")
+        print(f"   • {etiqueta_diametro}: {diametro}")
         print(f"   • Densidad: {nx.density(red.G):.4f}")
         
         # 2. Agrupar segmentos usando DFS
@@ -447,51 +753,105 @@ def main(input_dir='./data', output_dir='./data'):
         # 3. Analizar resultados
         red.analizar_resultados(output_dir)
         
-        # 4. Exportar para GIS
-        print("\n" + "=" * 70)
-        print("🗺️  PREPARANDO DATOS PARA GIS")
-        print("=" * 70)
-        
-        # Crear GeoDataFrame para exportar a Shapefile/GeoJSON
-        import geopandas as gpd
-        from shapely.geometry import LineString
-        
-        # Datos de ejemplo de coordenadas (en realidad usarías tus coordenadas reales)
-        # Aquí asumimos que los nodos tienen coordenadas x,y
-        geometrias = []
-        atributos = []
-        
-        for u, v, data in red.G.edges(data=True):
-            # Obtener coordenadas de los nodos
-            u_pos = red.G.nodes[u]['pos']
-            v_pos = red.G.nodes[v]['pos']
-            
-            # Crear LineString
-            linea = LineString([u_pos, v_pos])
-            geometrias.append(linea)
-            
-            # Atributos
-            atributos.append({
-                'id_segmento': data['id_segmento'],
-                'grupo_id': red.segmentos_por_grupo.get(data['id_segmento'], -1),
-                'longitud_m': data['longitud_m'],
-                'tipo_conductor': data['tipo_conductor'],
-                'circuito': data['id_circuito'],
-                'nodo_inicio': u,
-                'nodo_fin': v
+        # 4. Exportar para GIS (omitible con --no-gis: evita el costo de
+        # importar geopandas/shapely en corridas que solo necesitan CSV)
+        geojson_path = None
+        gpkg_path = None
+
+        # Exportar solo los formatos solicitados: cada to_file vuelve a
+        # serializar geometrías y atributos, así que omitir un formato
+        # ahorra una pasada completa. Se validan antes de importar
+        # geopandas para no pagar el import si no hay nada que escribir
+        formatos = {f.strip().lower() for f in formats.split(',') if f.strip()}
+        desconocidos = formatos - {'geojson', 'gpkg'}
+        if desconocidos:
+            print(f"⚠️  Formatos no reconocidos (se ignoran): "
+                  f"{', '.join(sorted(desconocidos))}. "
+                  f"Formatos soportados: geojson, gpkg")
+        formatos -= desconocidos
+
+        if not no_gis and formatos:
+            print("\n" + "=" * 70)
+            print("🗺️  PREPARANDO DATOS PARA GIS")
+            print("=" * 70)
+
+            # Crear GeoDataFrame para exportar a Shapefile/GeoJSON
+            import geopandas as gpd
+            import shapely
+
+            # Construir todas las geometrías de una vez con el constructor
+            # vectorizado de Shapely 2.x, en lugar de un LineString por arista
+            node_xy = df_nodos[['x', 'y']].to_numpy(np.float64)
+            idx_nodo = pd.Series(np.arange(len(df_nodos)),
+                                 index=df_nodos['id_nodo'])
+            u_idx = idx_nodo[df_segmentos['nodo_inicio']].to_numpy()
+            v_idx = idx_nodo[df_segmentos['nodo_fin']].to_numpy()
+            coords = np.stack([node_xy[u_idx], node_xy[v_idx]], axis=1)
+            geometrias = shapely.linestrings(coords)
+
+            # Atributos en columnas, directamente desde el DataFrame de segmentos
+            atributos = pd.DataFrame({
+                'id_segmento': df_segmentos['id_segmento'],
+                'grupo_id': df_segmentos['id_segmento']
+                            .map(red.segmentos_por_grupo).fillna(-1).astype(int),
+                'longitud_m': df_segmentos['longitud_m'],
+                'tipo_conductor': df_segmentos['tipo_conductor'],
+                'circuito': df_segmentos['id_circuito'],
+                'nodo_inicio': df_segmentos['nodo_inicio'],
+                'nodo_fin': df_segmentos['nodo_fin']
             })
-        
-        gdf = gpd.GeoDataFrame(atributos, geometry=geometrias, crs="EPSG:4326")
-        geojson_path = os.path.join(output_dir, 'segmentos_con_grupos.geojson')
-        gpkg_path = os.path.join(output_dir, 'segmentos_con_grupos.gpkg')
-        gdf.to_file(geojson_path, driver='GeoJSON')
-        gdf.to_file(gpkg_path, driver='GPKG')
-        
-        print(f"✅ GeoJSON exportado: '{geojson_path}'")
-        print(f"✅ GeoPackage exportado: '{gpkg_path}'")
-        print(f"   {len(gdf)} segmentos con información de grupo")
-        
+
+            gdf = gpd.GeoDataFrame(atributos, geometry=geometrias, crs="EPSG:4326")
+
+            # Escribir con pyogrio (bindings C++ de GDAL) si está instalado;
+            # engine=None deja que GeoPandas use su motor por defecto
+            try:
+                import pyogrio  # noqa: F401
+                gis_engine = 'pyogrio'
+            except ImportError:
+                gis_engine = None
+
+            escrituras = []
+            if 'geojson' in formatos:
+                geojson_path = os.path.join(output_dir, 'segmentos_con_grupos.geojson')
+                escrituras.append((geojson_path, 'GeoJSON'))
+            if 'gpkg' in formatos:
+                gpkg_path = os.path.join(output_dir, 'segmentos_con_grupos.gpkg')
+                escrituras.append((gpkg_path, 'GPKG'))
+
+            if len(escrituras) > 1:
+                # Dos archivos independientes: escribirlos en paralelo,
+                # GDAL libera el GIL durante la escritura a disco
+                with ThreadPoolExecutor(max_workers=len(escrituras)) as pool:
+                    futuros = [
+                        pool.submit(gdf.to_file, ruta, driver=driver,
+                                    engine=gis_engine)
+                        for ruta, driver in escrituras
+                    ]
+                    for futuro in futuros:
+                        futuro.result()
+            elif escrituras:
+                ruta, driver = escrituras[0]
+                gdf.to_file(ruta, driver=driver, engine=gis_engine)
+
+            if geojson_path:
+                print(f"✅ GeoJSON exportado: '{geojson_path}'")
+            if gpkg_path:
+                print(f"✅ GeoPackage exportado: '{gpkg_path}'")
+            print(f"   {len(gdf)} segmentos con información de grupo")
+        
+        # Archivos realmente escritos (los de GIS solo si se exportaron)
+        files = {
+            'grupos': os.path.join(output_dir, 'grupos_1km.csv'),
+            'segmentos': os.path.join(output_dir, 'segmentos_con_grupo.csv'),
+            **({'geojson': geojson_path} if geojson_path else {}),
+            **({'gpkg': gpkg_path} if gpkg_path else {})
+        }
+
         # Resumen final
+        lista_archivos = '\n'.join(
+            f"       • {os.path.basename(ruta)}" for ruta in files.values()
+        )
         print("\n" + "=" * 70)
         print("✅ PROCESO COMPLETADO EXITOSAMENTE")
         print("=" * 70)
@@ -501,17 +861,14 @@ def main(input_dir='./data', output_dir='./data'):
     2. 🔗 Grafo construido: {red.G.number_of_nodes()} nodos, {red.G.number_of_edges()} aristas
     3. 🎯 Segmentos agrupados: {len(red.grupos)} grupos de ~1km
     4. 💾 Archivos generados en {output_dir}:
-       • grupos_1km.csv
-       • segmentos_con_grupo.csv  
-       • segmentos_con_grupos.geojson
-       • segmentos_con_grupos.gpkg
-    
+{lista_archivos}
+
     Siguientes pasos sugeridos:
     • Importa el GeoJSON o GeoPackage a QGIS/ArcGIS
     • Usa el campo 'grupo_id' para simbología
     • Calcula estadísticas por grupo en tu GIS
         """)
-    
+
         # Return results for library usage
         return {
             'success': True,
@@ -522,12 +879,7 @@ def main(input_dir='./data', output_dir='./data'):
                 'num_segmentos': len(df_segmentos),
                 'num_nodos': len(df_nodos)
             },
-            'files': {
-                'grupos': os.path.join(output_dir, 'grupos_1km.csv'),
-                'segmentos': os.path.join(output_dir, 'segmentos_con_grupo.csv'),
-                'geojson': geojson_path,
-                'gpkg': gpkg_path
-            }
+            'files': files
         }
     except Exception as e:
         print(f"\n❌ ERROR: {str(e)}")
@@ -551,14 +903,20 @@ if __name__ == "__main__":
     input_dir = args.input_dir
     output_dir = args.output_dir
     
-    # Validar y crear directorios
-    if not os.path.exists(input_dir):
+    # Validar y crear directorios: un solo intento de scandir responde
+    # existencia y legibilidad a la vez (sin la ventana exists/access)
+    try:
+        with os.scandir(input_dir):
+            pass
+    except FileNotFoundError:
         print(f"⚠️  El directorio de entrada '{input_dir}' no existe. Será creado.")
         os.makedirs(input_dir, exist_ok=True)
-    
-    if not os.access(input_dir, os.R_OK):
+    except PermissionError:
         print(f"❌ Error: El directorio de entrada '{input_dir}' no es legible.")
         exit(1)
+    except NotADirectoryError:
+        print(f"❌ Error: '{input_dir}' no es un directorio.")
+        exit(1)
     
     # Crear directorio de salida si no existe
     os.makedirs(output_dir, exist_ok=True)
@@ -568,7 +926,9 @@ if __name__ == "__main__":
     print(f"   • Directorio de salida: {output_dir}")
     
     # Ejecutar proceso principal
-    result = main(input_dir, output_dir)
+    result = main(input_dir, output_dir, formats=args.formats,
+                  compute_diameter=args.compute_diameter,
+                  no_gis=args.no_gis)
     
     # Exit with appropriate code
     import sys
@@ -20,18 +20,67 @@ Version: 2.0
 
 import pandas as pd
 import networkx as nx
+import numpy as np
 import os
 import sys
 import argparse
+import csv
 import json
 from typing import Tuple, Dict, Optional
 from datetime import datetime
 
+# orjson is optional: when installed, Cytoscape JSON is serialized with
+# its C encoder (much faster on large graphs); otherwise stdlib json is used
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# pyarrow is optional: when installed, CSVs are parsed with its
+# multithreaded reader instead of pandas' single-threaded C tokenizer
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# scipy is optional: when installed, connectivity and diameter are
+# computed with the compiled csgraph routines instead of NetworkX's
+# Python-level BFS
+try:
+    from scipy.sparse.csgraph import connected_components, shortest_path
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
 # Constants for visualization
 EDGE_WIDTH_SCALE_FACTOR = 1000  # Scale factor for calculating edge width based on length
 MIN_EDGE_WIDTH = 1
 MAX_EDGE_WIDTH = 5
 
+# Color/size per node type, built once at module level so per-node
+# lookups don't reconstruct the dicts on every call
+COLOR_MAP = {
+    'Subestacion': '#FF0000',      # Red
+    'Apoyo': '#4169E1',             # Royal Blue
+    'AEREO': '#4169E1',             # Royal Blue
+    'POSTE EN H': "#748DDA",      # Royal Blue
+    'CAJA DE INSPECCION': "#604603", # Royal Blue
+    'INTERRUPTORDIS': "#53128F",     # Royal Blue
+    'Derivacion': '#FFD700',        # Gold
+    'Transformador': '#32CD32',     # Lime Green
+}
+DEFAULT_NODE_COLOR = '#808080'  # Gray
+
+SIZE_MAP = {
+    'Subestacion': 35,
+    'Derivacion': 25,
+    'Transformador': 25,
+    'Apoyo': 15,
+}
+DEFAULT_NODE_SIZE = 15
+
 
 def create_example_data() -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
@@ -103,10 +152,11 @@ def load_csv_data(input_dir: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
     
     # Load CSV files
     try:
-        df_nodos = pd.read_csv(nodes_path)
+        engine = 'pyarrow' if PYARROW_AVAILABLE else None
+        df_nodos = pd.read_csv(nodes_path, engine=engine)
         print(f"✅ Loaded {len(df_nodos)} nodes from {nodes_path}")
-        
-        df_segmentos = pd.read_csv(segments_path)
+
+        df_segmentos = pd.read_csv(segments_path, engine=engine)
         print(f"✅ Loaded {len(df_segmentos)} segments from {segments_path}")
         
         return df_nodos, df_segmentos
@@ -130,29 +180,31 @@ def create_networkx_graph(df_nodos: pd.DataFrame, df_segmentos: pd.DataFrame) ->
     print("\n🔗 Creating NetworkX graph...")
     
     G = nx.Graph()
-    
-    # Add nodes with attributes
-    for _, nodo in df_nodos.iterrows():
-        G.add_node(
-            nodo['id_nodo'],
-            nombre=nodo['nombre'],
-            tipo=nodo['tipo'],
-            voltaje_kv=nodo['voltaje_kv'],
-            x=nodo['x'],
-            y=nodo['y']
-        )
-    
-    # Add edges (segments) with attributes
-    for _, segmento in df_segmentos.iterrows():
-        G.add_edge(
-            segmento['nodo_inicio'],
-            segmento['nodo_fin'],
-            id_segmento=segmento['id_segmento'],
-            longitud_m=segmento['longitud_m'],
-            tipo_conductor=segmento['tipo_conductor'],
-            capacidad_amp=segmento['capacidad_amp'],
-            id_circuito=segmento['id_circuito']
-        )
+
+    # Add nodes with attributes in bulk (itertuples avoids the per-row
+    # Series allocation that makes iterrows slow)
+    G.add_nodes_from(
+        (nodo.id_nodo, {
+            'nombre': nodo.nombre,
+            'tipo': nodo.tipo,
+            'voltaje_kv': nodo.voltaje_kv,
+            'x': nodo.x,
+            'y': nodo.y
+        })
+        for nodo in df_nodos.itertuples(index=False)
+    )
+
+    # Add edges (segments) with attributes in bulk
+    G.add_edges_from(
+        (segmento.nodo_inicio, segmento.nodo_fin, {
+            'id_segmento': segmento.id_segmento,
+            'longitud_m': segmento.longitud_m,
+            'tipo_conductor': segmento.tipo_conductor,
+            'capacidad_amp': segmento.capacidad_amp,
+            'id_circuito': segmento.id_circuito
+        })
+        for segmento in df_segmentos.itertuples(index=False)
+    )
     
     print(f"✅ Graph created: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
     
@@ -169,17 +221,7 @@ def get_node_color(node_type: str) -> str:
     Returns:
         Color code in hex format
     """
-    color_map = {
-        'Subestacion': '#FF0000',      # Red
-        'Apoyo': '#4169E1',             # Royal Blue
-        'AEREO': '#4169E1',             # Royal Blue
-        'POSTE EN H': "#748DDA",      # Royal Blue
-        'CAJA DE INSPECCION': "#604603", # Royal Blue
-        'INTERRUPTORDIS': "#53128F",     # Royal Blue
-        'Derivacion': '#FFD700',        # Gold
-        'Transformador': '#32CD32',     # Lime Green
-    }
-    return color_map.get(node_type, '#808080')  # Default: Gray
+    return COLOR_MAP.get(node_type, DEFAULT_NODE_COLOR)
 
 
 def get_node_size(node_type: str) -> int:
@@ -192,13 +234,7 @@ def get_node_size(node_type: str) -> int:
     Returns:
         Size value for the node
     """
-    size_map = {
-        'Subestacion': 35,
-        'Derivacion': 25,
-        'Transformador': 25,
-        'Apoyo': 15,
-    }
-    return size_map.get(node_type, 15)
+    return SIZE_MAP.get(node_type, DEFAULT_NODE_SIZE)
 
 
 def export_minimal_graph_data(G: nx.Graph, output_dir: str) -> dict:
@@ -208,26 +244,29 @@ def export_minimal_graph_data(G: nx.Graph, output_dir: str) -> dict:
     Nodes: id_nodo, es_subestacion (bool), nombre (only for substation)
     Edges: id_segmento, nodo_inicio, nodo_fin
     """
-    nodes_out = []
-    for node_id in G.nodes():
-        node = G.nodes[node_id]
-        is_sub = node.get('tipo') == 'Subestacion'
-        name = node.get('nombre') if is_sub else ''
-        nodes_out.append({'id_nodo': node_id, 'es_subestacion': is_sub, 'nombre': name})
-
-    edges_out = []
-    for u, v, data in G.edges(data=True):
-        edges_out.append({'id_segmento': data.get('id_segmento'), 'nodo_inicio': u, 'nodo_fin': v})
-
     # Ensure output dir exists
     os.makedirs(output_dir, exist_ok=True)
 
     nodes_path = os.path.join(output_dir, 'graph_nodes_minimal.csv')
     edges_path = os.path.join(output_dir, 'graph_edges_minimal.csv')
 
+    # Stream rows directly with csv.writer: no list-of-dicts intermediate
+    # and no throwaway DataFrame just to call to_csv
     try:
-        pd.DataFrame(nodes_out).to_csv(nodes_path, index=False)
-        pd.DataFrame(edges_out).to_csv(edges_path, index=False)
+        with open(nodes_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['id_nodo', 'es_subestacion', 'nombre'])
+            for node_id, node in G.nodes(data=True):
+                is_sub = node.get('tipo') == 'Subestacion'
+                name = node.get('nombre') if is_sub else ''
+                writer.writerow((node_id, is_sub, name))
+
+        with open(edges_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['id_segmento', 'nodo_inicio', 'nodo_fin'])
+            for u, v, seg_id in G.edges(data='id_segmento'):
+                writer.writerow((seg_id, u, v))
+
         print(f"✅ Minimal node data saved to: {nodes_path}")
         print(f"✅ Minimal edge data saved to: {edges_path}")
     except Exception as e:
@@ -237,14 +276,85 @@ def export_minimal_graph_data(G: nx.Graph, output_dir: str) -> dict:
     return {'nodes': nodes_path, 'edges': edges_path, 'error': None}
 
 
-def export_cytoscape_json(G: nx.Graph, output_dir: str) -> str:
+def _write_cytoscape_json(elements: list, output_dir: str) -> str:
+        """Serializar la lista de elementos Cytoscape a graph_cytoscape.json"""
+        os.makedirs(output_dir, exist_ok=True)
+        out = {'elements': elements}
+        out_path = os.path.join(output_dir, 'graph_cytoscape.json')
+        try:
+                if ORJSON_AVAILABLE:
+                        # One contiguous bytes buffer, written in a single call;
+                        # OPT_SERIALIZE_NUMPY handles the numpy scalars from pandas
+                        with open(out_path, 'wb') as f:
+                                f.write(orjson.dumps(
+                                        out,
+                                        option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                                ))
+                else:
+                        with open(out_path, 'w', encoding='utf-8') as f:
+                                json.dump(out, f, ensure_ascii=False, indent=2)
+                print(f"✅ Cytoscape JSON saved to: {out_path}")
+        except Exception as e:
+                print(f"⚠️ Error saving Cytoscape JSON: {e}")
+                out_path = ''
+
+        return out_path
+
+
+def export_cytoscape_json_from_df(df_nodos: pd.DataFrame,
+                                  df_segmentos: pd.DataFrame,
+                                  output_dir: str) -> str:
+        """
+        Export the Cytoscape JSON straight from the CSV DataFrames,
+        without building a NetworkX graph first.
+
+        Fast path for export-only runs: colors/widths are computed
+        column-wise and dicts materialize only at the JSON boundary.
+        Assumes every segment endpoint appears in df_nodos.
+        """
+        nodes_df = pd.DataFrame({
+                'id': df_nodos['id_nodo'].astype(str),
+                'nombre': df_nodos['nombre'],
+                'tipo': df_nodos['tipo'],
+                'voltaje_kv': df_nodos['voltaje_kv'],
+                'x': df_nodos['x'],
+                'y': df_nodos['y'],
+                'color': df_nodos['tipo'].map(COLOR_MAP).fillna(DEFAULT_NODE_COLOR)
+        })
+        widths = np.clip(
+                np.nan_to_num(df_segmentos['longitud_m'].to_numpy(np.float64))
+                / EDGE_WIDTH_SCALE_FACTOR,
+                MIN_EDGE_WIDTH, MAX_EDGE_WIDTH
+        )
+        edges_df = pd.DataFrame({
+                'id': df_segmentos['id_segmento'].astype(str),
+                'source': df_segmentos['nodo_inicio'].astype(str),
+                'target': df_segmentos['nodo_fin'].astype(str),
+                'longitud_m': df_segmentos['longitud_m'],
+                'width': widths,
+                'color': '#888888'
+        })
+        elements = [{'data': r} for r in nodes_df.to_dict('records')]
+        elements.extend({'data': r} for r in edges_df.to_dict('records'))
+
+        return _write_cytoscape_json(elements, output_dir)
+
+
+def export_cytoscape_json(G: nx.Graph, output_dir: str,
+                          df_nodos: Optional[pd.DataFrame] = None,
+                          df_segmentos: Optional[pd.DataFrame] = None) -> str:
         """
         Export graph to a Cytoscape.js-compatible JSON file.
 
         Nodes include: id, nombre, tipo, voltaje_kv, x, y, color
         Edges include: id, source, target, longitud_m, width, color
+
+        When the source DataFrames are provided, the export is delegated
+        to export_cytoscape_json_from_df (vectorized, no graph walk).
         """
-        os.makedirs(output_dir, exist_ok=True)
+        if df_nodos is not None and df_segmentos is not None:
+                return export_cytoscape_json_from_df(df_nodos, df_segmentos,
+                                                     output_dir)
 
         elements = []
         # Nodes
@@ -275,101 +385,14 @@ def export_cytoscape_json(G: nx.Graph, output_dir: str) -> str:
                 }
                 elements.append({'data': edge_data})
 
-        out = {'elements': elements}
-        out_path = os.path.join(output_dir, 'graph_cytoscape.json')
-        try:
-                with open(out_path, 'w', encoding='utf-8') as f:
-                        json.dump(out, f, ensure_ascii=False, indent=2)
-                print(f"✅ Cytoscape JSON saved to: {out_path}")
-        except Exception as e:
-                print(f"⚠️ Error saving Cytoscape JSON: {e}")
-                out_path = ''
-
-        return out_path
-
-
-def create_cytoscape_html(output_dir: str, json_filename: str, stats: Dict, title: str = "Red Eléctrica - Cytoscape") -> str:
-        """
-        Create a standalone HTML file that loads the cytoscape JSON via fetch
-        and renders the graph using Cytoscape.js. Also displays the graph statistics
-        in a side panel to preserve presentation.
-        
-        UI/UX Improvements:
-        -------------------
-        - Modern, clean design with improved color scheme
-        - Toggle button to show/hide all node labels conditionally
-        - Interactive zoom controls (Zoom In, Zoom Out, Reset, Fit)
-        - Better visual hierarchy and spacing
-        - Responsive layout with enhanced styling
-        - Improved node and edge styling
-        - Smooth animations and transitions
-        
-        Layout Algorithm: cose-bilkent
-        -------------------------------
-        Uses the cose-bilkent layout algorithm which is specifically designed for:
-        - Hierarchical network structures (like electrical distribution systems)
-        - Force-directed positioning with high quality results
-        - Automatic minimization of edge crossings
-        - Clear visualization of tree-like structures with branches
-        - Superior to circle layout for showing network flow and topology
-        
-        This layout is ideal for electrical networks as it naturally shows the 
-        hierarchical flow from the substation through the distribution network,
-        making it easy to understand the network topology and identify branches.
-        """
-        os.makedirs(output_dir, exist_ok=True)
-        html_path = os.path.join(output_dir, 'red_electrica_cytoscape.html')
-
-        # Build an HTML snippet for stats (simple layout preserving values)
-        stats_html_lines = []
-        stats_html_lines.append(f"<h2>📊 Estadísticas del Grafo</h2>")
-        stats_html_lines.append('<div class="stat-block">')
-        stats_html_lines.append('<div class="stat-section">')
-        stats_html_lines.append('<h3>🔢 Propiedades</h3>')
-        stats_html_lines.append(f"<p><span class='stat-label'>Nodos:</span> <span class='stat-value'>{stats.get('num_nodes', 0)}</span></p>")
-        stats_html_lines.append(f"<p><span class='stat-label'>Aristas:</span> <span class='stat-value'>{stats.get('num_edges', 0)}</span></p>")
-        stats_html_lines.append(f"<p><span class='stat-label'>Conectado:</span> <span class='stat-value'>{'Sí' if stats.get('is_connected') else 'No'}</span></p>")
-        stats_html_lines.append(f"<p><span class='stat-label'>Componentes:</span> <span class='stat-value'>{stats.get('num_components')}</span></p>")
-        stats_html_lines.append(f"<p><span class='stat-label'>Densidad:</span> <span class='stat-value'>{stats.get('density', 0):.4f}</span></p>")
-        if stats.get('diameter') is not None:
-                stats_html_lines.append(f"<p><span class='stat-label'>Diámetro:</span> <span class='stat-value'>{stats.get('diameter')}</span></p>")
-        stats_html_lines.append('</div>')
-        stats_html_lines.append('<div class="stat-section">')
-        stats_html_lines.append('<h3>🏗️ Tipos de Nodos</h3>')
-        for t, c in stats.get('node_types', {}).items():
-                stats_html_lines.append(f"<p><span class='stat-label'>{t}:</span> <span class='stat-value'>{c}</span></p>")
-        stats_html_lines.append('</div>')
-        stats_html_lines.append('<div class="stat-section">')
-        stats_html_lines.append('<h3>📏 Longitudes</h3>')
-        stats_html_lines.append(f"<p><span class='stat-label'>Total:</span> <span class='stat-value'>{stats.get('total_length_km', 0):.2f} km</span></p>")
-        stats_html_lines.append(f"<p><span class='stat-label'>Promedio:</span> <span class='stat-value'>{stats.get('avg_edge_length_m', 0):.1f} m</span></p>")
-        stats_html_lines.append(f"<p><span class='stat-label'>Mínimo:</span> <span class='stat-value'>{stats.get('min_edge_length_m', 0):.1f} m</span></p>")
-        stats_html_lines.append(f"<p><span class='stat-label'>Máximo:</span> <span class='stat-value'>{stats.get('max_edge_length_m', 0):.1f} m</span></p>")
-        stats_html_lines.append('</div>')
-        stats_html_lines.append('</div>')
-        stats_html = '\n'.join(stats_html_lines)
+        return _write_cytoscape_json(elements, output_dir)
 
-        # Build dynamic legend based on actual node types in the data
-        legend_html_lines = []
-        legend_html_lines.append('<div class="legend">')
-        legend_html_lines.append('<h2>🎨 Leyenda</h2>')
-        
-        # Get node types from stats and generate legend items dynamically
-        node_types = stats.get('node_types', {})
-        for node_type in sorted(node_types):
-            color = get_node_color(node_type)
-            legend_html_lines.append('<div class="legend-item">')
-            legend_html_lines.append(f'<div class="legend-color" style="background: {color};"></div>')
-            legend_html_lines.append(f'<span>{node_type}</span>')
-            legend_html_lines.append('</div>')
-        
-        legend_html_lines.append('</div>')
-        legend_html = '\n'.join(legend_html_lines)
 
-        # Enhanced Cytoscape HTML template with improved UI/UX
-        json_basename = os.path.basename(json_filename)
-        # Use a placeholder template (not an f-string) to avoid brace-escaping issues
-        html_template = """
+# Enhanced Cytoscape HTML template with improved UI/UX. Kept at module
+# level so the ~500-line literal is built once at import time instead of
+# on every call; placeholders (not an f-string) avoid brace-escaping
+# issues with the embedded CSS/JS.
+_HTML_TEMPLATE = """
     <!doctype html>
     <html lang="es">
     <head>
@@ -879,8 +902,94 @@ def create_cytoscape_html(output_dir: str, json_filename: str, stats: Dict, titl
     </html>
     """
 
+
+def create_cytoscape_html(output_dir: str, json_filename: str, stats: Dict, title: str = "Red Eléctrica - Cytoscape") -> str:
+        """
+        Create a standalone HTML file that loads the cytoscape JSON via fetch
+        and renders the graph using Cytoscape.js. Also displays the graph statistics
+        in a side panel to preserve presentation.
+        
+        UI/UX Improvements:
+        -------------------
+        - Modern, clean design with improved color scheme
+        - Toggle button to show/hide all node labels conditionally
+        - Interactive zoom controls (Zoom In, Zoom Out, Reset, Fit)
+        - Better visual hierarchy and spacing
+        - Responsive layout with enhanced styling
+        - Improved node and edge styling
+        - Smooth animations and transitions
+        
+        Layout Algorithm: cose-bilkent
+        -------------------------------
+        Uses the cose-bilkent layout algorithm which is specifically designed for:
+        - Hierarchical network structures (like electrical distribution systems)
+        - Force-directed positioning with high quality results
+        - Automatic minimization of edge crossings
+        - Clear visualization of tree-like structures with branches
+        - Superior to circle layout for showing network flow and topology
+        
+        This layout is ideal for electrical networks as it naturally shows the 
+        hierarchical flow from the substation through the distribution network,
+        making it easy to understand the network topology and identify branches.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        html_path = os.path.join(output_dir, 'red_electrica_cytoscape.html')
+
+        # Build an HTML snippet for stats (simple layout preserving values)
+        diameter_html = (
+                f"\n<p><span class='stat-label'>Diámetro:</span> <span class='stat-value'>{stats.get('diameter')}</span></p>"
+                if stats.get('diameter') is not None else ''
+        )
+        node_types = stats.get('node_types', {})
+        node_types_html = ''.join(
+                f"\n<p><span class='stat-label'>{t}:</span> <span class='stat-value'>{c}</span></p>"
+                for t, c in node_types.items()
+        )
+        stats_html = (
+                "<h2>📊 Estadísticas del Grafo</h2>\n"
+                '<div class="stat-block">\n'
+                '<div class="stat-section">\n'
+                '<h3>🔢 Propiedades</h3>\n'
+                f"<p><span class='stat-label'>Nodos:</span> <span class='stat-value'>{stats.get('num_nodes', 0)}</span></p>\n"
+                f"<p><span class='stat-label'>Aristas:</span> <span class='stat-value'>{stats.get('num_edges', 0)}</span></p>\n"
+                f"<p><span class='stat-label'>Conectado:</span> <span class='stat-value'>{'Sí' if stats.get('is_connected') else 'No'}</span></p>\n"
+                f"<p><span class='stat-label'>Componentes:</span> <span class='stat-value'>{stats.get('num_components')}</span></p>\n"
+                f"<p><span class='stat-label'>Densidad:</span> <span class='stat-value'>{stats.get('density', 0):.4f}</span></p>"
+                f"{diameter_html}\n"
+                '</div>\n'
+                '<div class="stat-section">\n'
+                '<h3>🏗️ Tipos de Nodos</h3>'
+                f"{node_types_html}\n"
+                '</div>\n'
+                '<div class="stat-section">\n'
+                '<h3>📏 Longitudes</h3>\n'
+                f"<p><span class='stat-label'>Total:</span> <span class='stat-value'>{stats.get('total_length_km', 0):.2f} km</span></p>\n"
+                f"<p><span class='stat-label'>Promedio:</span> <span class='stat-value'>{stats.get('avg_edge_length_m', 0):.1f} m</span></p>\n"
+                f"<p><span class='stat-label'>Mínimo:</span> <span class='stat-value'>{stats.get('min_edge_length_m', 0):.1f} m</span></p>\n"
+                f"<p><span class='stat-label'>Máximo:</span> <span class='stat-value'>{stats.get('max_edge_length_m', 0):.1f} m</span></p>\n"
+                '</div>\n'
+                '</div>'
+        )
+
+        # Build dynamic legend based on actual node types in the data
+        legend_items = ''.join(
+                '\n<div class="legend-item">'
+                f'\n<div class="legend-color" style="background: {COLOR_MAP.get(node_type, DEFAULT_NODE_COLOR)};"></div>'
+                f'\n<span>{node_type}</span>'
+                '\n</div>'
+                for node_type in sorted(node_types)
+        )
+        legend_html = (
+                '<div class="legend">\n'
+                '<h2>🎨 Leyenda</h2>'
+                f'{legend_items}\n'
+                '</div>'
+        )
+
+        json_basename = os.path.basename(json_filename)
+
         gen_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        html_content = html_template.replace('<<<TITLE>>>', title).replace('<<<STATS_HTML>>>', stats_html).replace('<<<LEGEND_HTML>>>', legend_html).replace('<<<JSON>>>', json_basename).replace('<<<GEN_TIME>>>', gen_time)
+        html_content = _HTML_TEMPLATE.replace('<<<TITLE>>>', title).replace('<<<STATS_HTML>>>', stats_html).replace('<<<LEGEND_HTML>>>', legend_html).replace('<<<JSON>>>', json_basename).replace('<<<GEN_TIME>>>', gen_time)
 
         # write files: ensure JSON is copied/moved in same output_dir so fetch path works
         # (json already written by export_cytoscape_json into output_dir)
@@ -905,19 +1014,38 @@ def generate_graph_statistics(G: nx.Graph) -> Dict:
     Returns:
         Dictionary with graph statistics
     """
-    stats = {
-        'num_nodes': G.number_of_nodes(),
-        'num_edges': G.number_of_edges(),
-        'is_connected': nx.is_connected(G),
-        'num_components': nx.number_connected_components(G),
-        'density': nx.density(G)
-    }
-    
-    # Calculate diameter only if connected
-    if stats['is_connected']:
-        stats['diameter'] = nx.diameter(G)
+    if SCIPY_AVAILABLE and G.number_of_nodes() > 0:
+        # One CSR conversion feeds both connectivity and diameter,
+        # computed in C instead of two full BFS passes in Python
+        A = nx.to_scipy_sparse_array(G, format='csr')
+        num_components, _ = connected_components(A, directed=False)
+        stats = {
+            'num_nodes': G.number_of_nodes(),
+            'num_edges': G.number_of_edges(),
+            'is_connected': num_components == 1,
+            'num_components': int(num_components),
+            'density': nx.density(G)
+        }
+        if stats['is_connected']:
+            dist = shortest_path(A, method='D', directed=False,
+                                 unweighted=True)
+            stats['diameter'] = int(dist.max())
+        else:
+            stats['diameter'] = None
     else:
-        stats['diameter'] = None
+        stats = {
+            'num_nodes': G.number_of_nodes(),
+            'num_edges': G.number_of_edges(),
+            'is_connected': nx.is_connected(G),
+            'num_components': nx.number_connected_components(G),
+            'density': nx.density(G)
+        }
+
+        # Calculate diameter only if connected
+        if stats['is_connected']:
+            stats['diameter'] = nx.diameter(G)
+        else:
+            stats['diameter'] = None
     
     # Node type distribution
     node_types = {}
@@ -1032,7 +1160,7 @@ def main(
         
         # Export Cytoscape JSON and create HTML viewer
         try:
-            cyto_json = export_cytoscape_json(G, output_dir)
+            cyto_json = export_cytoscape_json(G, output_dir, df_nodos, df_segmentos)
             result['cytoscape_json'] = cyto_json
             if cyto_json:
                 cyto_html = create_cytoscape_html(output_dir, cyto_json, stats, title="Red Eléctrica")